@@ -1,10 +1,12 @@
 #! /usr/bin/env python3
 
 import urllib3
+import atexit
 import json
 import sys
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 JELLYFIN_MAX_WATCH_TIME_MINUTES = int(
@@ -17,6 +19,10 @@ JELLYFIN_TOKEN = os.getenv("JELLYFIN_TOKEN")
 # Ticks in Jellyfin are 100-nanosecond units (10,000,000 per second).
 TICKS_PER_SECOND = 10_000_000
 
+# How often to re-read the user policy even when the cached access state already
+# matches, so out-of-band changes (e.g. edits in the dashboard) get corrected.
+POLICY_RECHECK_SECONDS = 3600
+
 # Validate required environment variables
 
 if not JELLYFIN_TOKEN:
@@ -28,16 +34,40 @@ if not USER_NAME:
     sys.exit(1)
 
 # Initialize HTTP client
+# Every request goes to the same Jellyfin host, so parse the base URL once and
+# keep a single connection pool: requests reuse keep-alive sockets and skip
+# the per-call URL parsing/pool lookup a PoolManager would do. The pool holds
+# one socket per concurrent request (see HTTP_CONCURRENCY).
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-http = urllib3.PoolManager(cert_reqs="CERT_NONE")
+_base_url = urllib3.util.parse_url(JELLYFIN_BASE_URL)
+# Path prefix for servers hosted under a sub-path (e.g. https://host/jellyfin).
+BASE_PATH = (_base_url.path or "").rstrip("/")
+HTTP_CONCURRENCY = 2
+if _base_url.scheme == "https":
+    http = urllib3.HTTPSConnectionPool(
+        _base_url.host,
+        port=_base_url.port,
+        maxsize=HTTP_CONCURRENCY,
+        block=True,
+        cert_reqs="CERT_NONE",
+    )
+else:
+    http = urllib3.HTTPConnectionPool(
+        _base_url.host, port=_base_url.port, maxsize=HTTP_CONCURRENCY, block=True
+    )
 
 # Get script directory and file paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_FILE = os.path.join(SCRIPT_DIR, "jellyfin_time_limiter.log")
 STATE_FILE = os.path.join(SCRIPT_DIR, "jellyfin_time_limiter_state.json")
+CACHE_FILE = os.path.join(SCRIPT_DIR, "jellyfin_time_limiter_cache.json")
 
 # Cache last log message to avoid repeated file reads
 _last_log_message = None
+# Bytes read from the end of the log to find the last line (well over one line).
+LOG_TAIL_BYTES = 4096
+# Log file handle, opened on the first write and kept open until exit
+_log_file = None
 
 
 # Read last log message from file (cached after first read)
@@ -48,8 +78,12 @@ def _get_last_log_message():
 
     if os.path.exists(LOG_FILE):
         try:
-            with open(LOG_FILE, "r", encoding="utf-8") as f:
-                lines = f.readlines()
+            # Only the last line matters, so read just the tail of the file
+            # instead of the whole (possibly never-rotated) log.
+            with open(LOG_FILE, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - LOG_TAIL_BYTES))
+                lines = f.read().decode("utf-8", errors="ignore").splitlines()
                 if lines:
                     last_line = lines[-1].strip()
                     # Extract message part (everything after timestamp)
@@ -63,6 +97,15 @@ def _get_last_log_message():
     return _last_log_message
 
 
+# Open the log file once (line-buffered, so each entry hits disk immediately)
+def _get_log_file():
+    global _log_file
+    if _log_file is None:
+        _log_file = open(LOG_FILE, "a", encoding="utf-8", buffering=1)
+        atexit.register(_log_file.close)
+    return _log_file
+
+
 # Log with timestamp to file (only if message changed from last log)
 def log(message):
     global _last_log_message
@@ -75,8 +118,7 @@ def log(message):
     # Only write if message is different from last log
     if last_message != message:
         try:
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                f.write(log_line)
+            _get_log_file().write(log_line)
             # Update cache after successful write
             _last_log_message = message
         except IOError:
@@ -84,30 +126,30 @@ def log(message):
             print(log_line, file=sys.stderr, end="")
 
 
-# Make HTTP request to Jellyfin API
-def make_request(method, endpoint, headers=None, body=None):
-    url = f"{JELLYFIN_BASE_URL}{endpoint}"
-
-    # Default headers with authorization
-    default_headers = {
-        "Authorization": f'MediaBrowser Client="Python", Token="{JELLYFIN_TOKEN}"',
-    }
+# Request headers never change within a run, so build them once and share them
+# across calls (they are only copied when a caller adds extra headers).
+_AUTH_VALUE = f'MediaBrowser Client="Python", Token="{JELLYFIN_TOKEN}"'
+_AUTH_HEADERS = {"Authorization": _AUTH_VALUE}
+_JSON_HEADERS = {**_AUTH_HEADERS, "Content-Type": "application/json"}
 
-    # Merge with any additional headers
-    if headers:
-        default_headers.update(headers)
 
+# Make HTTP request to Jellyfin API
+def make_request(method, endpoint, headers=None, body=None):
     # Encode body if provided
+    request_headers = _AUTH_HEADERS
     encoded_body = None
     if body:
         if isinstance(body, dict):
             encoded_body = json.dumps(body).encode("utf-8")
-            if "Content-Type" not in default_headers:
-                default_headers["Content-Type"] = "application/json"
+            request_headers = _JSON_HEADERS
         else:
             encoded_body = body
 
-    return http.request(method, url, headers=default_headers, body=encoded_body)
+    # Merge with any additional headers
+    if headers:
+        request_headers = {**request_headers, **headers}
+
+    return http.urlopen(method, f"{BASE_PATH}{endpoint}", headers=request_headers, body=encoded_body)
 
 
 # Parse JSON response with error handling
@@ -116,8 +158,9 @@ def parse_json_response(response, context="response", fail_permissive=False):
     Parse JSON from HTTP response with error handling.
     """
     try:
-        return json.loads(response.data.decode("utf-8"))
-    except json.JSONDecodeError as e:
+        # json.loads accepts bytes directly, avoiding a decoded copy of the payload.
+        return json.loads(response.data)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
         log(f"Error: Failed to parse {context} JSON response: {e}")
         log(f"Raw response data: {response.data.decode('utf-8', errors='replace')}")
         if fail_permissive:
@@ -157,51 +200,120 @@ def load_state(today_date):
     return state
 
 
+# Write JSON to path atomically (temp file + rename) so readers never see a partial file.
+def _write_json_atomic(path, data, prefix):
+    fd, tmp_path = tempfile.mkstemp(dir=SCRIPT_DIR, prefix=prefix, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
 # Persist state atomically so a crash mid-write can't corrupt the running tally.
 def save_state(state):
     try:
-        fd, tmp_path = tempfile.mkstemp(dir=SCRIPT_DIR, prefix=".state-", suffix=".tmp")
-        with os.fdopen(fd, "w", encoding="utf-8") as f:
-            json.dump(state, f)
-        os.replace(tmp_path, STATE_FILE)
+        _write_json_atomic(STATE_FILE, state, prefix=".state-")
     except IOError as e:
         log(f"Warning: could not write state file ({e}); today's tally may not persist")
 
 
-# Find target user ID (needed for the policy endpoints)
-response = make_request("GET", "/Users")
+# Load the lookup cache (resolved user ID and last known access state).
+# Unlike the state file it is not reset daily, and losing it only costs extra
+# requests on the next run.
+# Cache shape:
+#   {
+#     "user_name": str,               # JELLYFIN_USER_NAME the entries belong to
+#     "user_id": str,                 # resolved Jellyfin user ID
+#     "enable_all_folders": bool,     # access state last written/verified
+#     "policy_checked_epoch": float,  # when that state was last verified
+#     "user_etag": str,               # ETag of the last GET /Users/{id}, if sent
+#     "user_policy": dict             # Policy from that response (reused on 304)
+#   }
+def load_cache():
+    if not os.path.exists(CACHE_FILE):
+        return {}
 
-if response.status != 200:
-    log(f"Error fetching users: {response.status}")
-    sys.exit(1)
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        # A bad cache is just a cache miss.
+        return {}
 
-target_user_id = None
+    # Entries resolved for a different user are useless; start over.
+    if not isinstance(cache, dict) or cache.get("user_name") != USER_NAME:
+        return {}
+    return cache
 
-users = parse_json_response(response, context="users")
 
-for user in users:
-    if user["Name"] == USER_NAME:
-        target_user_id = user["Id"]
-        break
+def save_cache(cache):
+    try:
+        _write_json_atomic(CACHE_FILE, cache, prefix=".cache-")
+    except IOError as e:
+        log(f"Warning: could not write cache file ({e})")
+
+
+# Resolve USER_NAME to its Jellyfin user ID via GET /Users.
+def resolve_user_id():
+    response = make_request("GET", "/Users")
+
+    if response.status != 200:
+        log(f"Error fetching users: {response.status}")
+        sys.exit(1)
+
+    users = parse_json_response(response, context="users")
+
+    for user in users:
+        if user["Name"] == USER_NAME:
+            return user["Id"]
 
-if not target_user_id:
     log(f"Error: User '{USER_NAME}' not found")
     sys.exit(1)
 
-# Accumulate today's watch time from live sessions (no plugin required).
-# We compare the playhead position between cron runs and add how far it moved,
-# capped by the wall-clock gap so seeks/fast-forwards can't inflate the tally.
+
 today_date = datetime.now().strftime("%Y-%m-%d")
 now_epoch = datetime.now().timestamp()
 
 state = load_state(today_date)
+
+# The daily total only grows, so once it has reached the limit access stays
+# disabled until midnight whatever is watched next; skip polling sessions.
+over_limit = state["total_seconds"] / 60 >= JELLYFIN_MAX_WATCH_TIME_MINUTES
+
+# GET /Sessions doesn't depend on the user lookup, so fetch it in the background
+# while resolving the user ID; the round-trips overlap instead of queueing.
+if not over_limit:
+    executor = ThreadPoolExecutor(max_workers=HTTP_CONCURRENCY - 1)
+    sessions_future = executor.submit(make_request, "GET", "/Sessions")
+
+# Find target user ID (needed for the policy endpoints). The username -> ID
+# mapping never changes, so it is cached on disk and GET /Users is only needed
+# on the first run or when the cached ID no longer exists.
+cache = load_cache()
+target_user_id = cache.get("user_id")
+user_id_from_cache = bool(target_user_id)
+
+if not target_user_id:
+    target_user_id = resolve_user_id()
+    cache = {"user_name": USER_NAME, "user_id": target_user_id}
+    save_cache(cache)
+
+# Accumulate today's watch time from live sessions (no plugin required).
+# We compare the playhead position between cron runs and add how far it moved,
+# capped by the wall-clock gap so seeks/fast-forwards can't inflate the tally.
 prev_sessions = state.get("sessions", {})
 prev_epoch = state.get("last_epoch", now_epoch)
 wall_gap_seconds = max(0.0, now_epoch - prev_epoch)
 
-response = make_request("GET", "/Sessions")
+if not over_limit:
+    response = sessions_future.result()
+    executor.shutdown()
 
-if response.status != 200:
+if over_limit:
+    # Nothing to accumulate. Drop the anchors so that, should the limit be
+    # raised later today, tracking restarts cleanly instead of counting
+    # playback that happened while we weren't polling.
+    new_sessions = {}
+elif response.status != 200:
     # Live session data is unavailable this run. Don't reset anchors and don't
     # accumulate; just evaluate against whatever total we already have. This is
     # fail-permissive for transient errors: temporary API hiccups won't wrongly
@@ -256,31 +368,65 @@ save_state(state)
 total_watch_time_minutes = state["total_seconds"] / 60
 ENABLE_ACCESS = total_watch_time_minutes < JELLYFIN_MAX_WATCH_TIME_MINUTES
 
-# Get current user policy to check if update is needed
-user_endpoint = f"/Users/{target_user_id}"
-response = make_request("GET", user_endpoint)
-
-if response.status != 200:
-    log(f"Error fetching user: {response.status}")
-    sys.exit(1)
-
-user_data = parse_json_response(response, context="user")
-current_policy = user_data.get("Policy", {})
-
-# Check if policy already matches desired state
-current_enable_all = current_policy.get("EnableAllFolders", True)
-current_enabled_folders = current_policy.get("EnabledFolders", [])
+# This script owns the access transitions, so the last state it wrote (or saw)
+# is cached. While that already matches the desired state, skip both the policy
+# GET and POST; re-check every POLICY_RECHECK_SECONDS to catch outside changes.
+policy_cache_fresh = (
+    cache.get("enable_all_folders") == ENABLE_ACCESS
+    and now_epoch - cache.get("policy_checked_epoch", 0) < POLICY_RECHECK_SECONDS
+)
 
-# Determine if update is needed
 needs_update = False
-if ENABLE_ACCESS:
-    # Want to enable: check if currently disabled
-    if not current_enable_all:
-        needs_update = True
-else:
-    # Want to disable: check if currently enabled
-    if current_enable_all or current_enabled_folders:
-        needs_update = True
+if not policy_cache_fresh:
+    # Get current user policy to check if update is needed. If we have the
+    # policy from a previous fetch, make the request conditional so an unchanged
+    # user comes back as an empty 304 instead of the full user object.
+    user_endpoint = f"/Users/{target_user_id}"
+    conditional_headers = None
+    if cache.get("user_etag") and "user_policy" in cache:
+        conditional_headers = {"If-None-Match": cache["user_etag"]}
+    response = make_request("GET", user_endpoint, headers=conditional_headers)
+
+    if response.status == 404 and user_id_from_cache:
+        # The cached ID is stale (user deleted/recreated); resolve it again.
+        # Sessions this run were matched against the old ID, so nothing was
+        # accumulated, but the next run will count normally.
+        log(f"Warning: cached user ID for '{USER_NAME}' not found; resolving again")
+        target_user_id = resolve_user_id()
+        cache = {"user_name": USER_NAME, "user_id": target_user_id}
+        user_endpoint = f"/Users/{target_user_id}"
+        response = make_request("GET", user_endpoint)
+
+    if response.status == 304 and "user_policy" in cache:
+        current_policy = cache["user_policy"]
+    elif response.status != 200:
+        log(f"Error fetching user: {response.status}")
+        sys.exit(1)
+    else:
+        user_data = parse_json_response(response, context="user")
+        current_policy = user_data.get("Policy", {})
+        # Remember the policy and its validator for the next conditional fetch.
+        etag = response.headers.get("ETag")
+        if etag:
+            cache["user_etag"] = etag
+            cache["user_policy"] = current_policy
+        else:
+            cache.pop("user_etag", None)
+            cache.pop("user_policy", None)
+
+    # Check if policy already matches desired state
+    current_enable_all = current_policy.get("EnableAllFolders", True)
+    current_enabled_folders = current_policy.get("EnabledFolders", [])
+
+    # Determine if update is needed
+    if ENABLE_ACCESS:
+        # Want to enable: check if currently disabled
+        if not current_enable_all:
+            needs_update = True
+    else:
+        # Want to disable: check if currently enabled
+        if current_enable_all or current_enabled_folders:
+            needs_update = True
 
 # Only update if needed
 if needs_update:
@@ -303,6 +449,16 @@ if needs_update:
         log(f"Response: {response.data.decode('utf-8')}")
         sys.exit(1)
 
+    # The cached copy of the policy is now out of date.
+    cache.pop("user_etag", None)
+    cache.pop("user_policy", None)
+
+# The policy now matches ENABLE_ACCESS (either verified or just written).
+if not policy_cache_fresh:
+    cache["enable_all_folders"] = ENABLE_ACCESS
+    cache["policy_checked_epoch"] = now_epoch
+    save_cache(cache)
+
 # Single line log with all information
 watch_time_str = f"{total_watch_time_minutes:.1f}"
 action = "enabled" if ENABLE_ACCESS else "disabled"